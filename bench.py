@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor
+from byte_utils import *
+from replay import percentile
+
+'''
+    性能测试工具
+    latency：模拟1.7+客户端的完整状态查询（握手->状态请求->ping），统计每一步的往返延迟
+        python bench.py latency --port 25565 -n 1000 -c 4
+    startup：在新进程中测量导入模块以及导入+绑定端口开始监听的耗时，超出预算时返回非0
+        python bench.py startup -n 10 --budget 300
+    memory：在本进程内启动服务器，用tracemalloc与RSS统计每个空闲连接与活动连接占用的内存
+        python bench.py memory -n 200 [--low-footprint]
+'''
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 在新进程中执行，向stderr输出 导入耗时 导入+监听耗时（秒），stdout为日志
+STARTUP_SCRIPT = """
+import os, sys, time
+begin = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import main
+from config import Config
+from slp_server import SlpServer
+imported = time.perf_counter()
+config = Config()
+config.read_config_file("slp_config.json")
+server = SlpServer(config.get_json_config())
+server.start()
+if not server.ready.wait(10):
+    os._exit(1)
+print(imported - begin, time.perf_counter() - begin, file=sys.stderr, flush=True)
+os._exit(0)
+"""
+
+
+def recv_packet(sock):
+    """读取一个完整的varint长度前缀数据包"""
+    length = 0
+    for j in range(5):
+        byte_in = read_exactly(sock, 1)[0]
+        length |= (byte_in & 0x7F) << (j * 7)
+        if (byte_in & 0x80) != 0x80:
+            break
+    return read_exactly(sock, length)
+
+
+def create_packet(packet):
+    data = bytearray()
+    write_varint(data, len(packet))
+    data += packet
+    return bytes(data)
+
+
+def create_handshake(host, port, state):
+    packet = bytearray()
+    write_byte(packet, 0x00)
+    write_varint(packet, 765)
+    write_utf(packet, host)
+    write_ushort(packet, port)
+    write_byte(packet, state)
+    return create_packet(packet)
+
+
+def status_query(host, port, nodelay):
+    """返回(状态响应耗时, pong耗时)，单位秒，与客户端一样分开发送握手包与状态请求"""
+    with socket.create_connection((host, port), timeout=10) as sock:
+        if nodelay:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+        begin = time.perf_counter()
+        sock.sendall(create_handshake(host, port, 0x01))
+        sock.sendall(create_packet(b"\x00"))
+        recv_packet(sock)
+        status_time = time.perf_counter()
+        sock.sendall(create_packet(b"\x01" + struct.pack(">q", 0)))
+        recv_packet(sock)
+        pong_time = time.perf_counter()
+    return status_time - begin, pong_time - status_time
+
+
+def run_latency(args):
+    status_latencies = []
+    pong_latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def run(_):
+        nonlocal errors
+        try:
+            status, pong = status_query(args.host, args.port, not args.client_nagle)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            status_latencies.append(status * 1000)
+            pong_latencies.append(pong * 1000)
+
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        executor.map(run, range(args.count))
+    elapsed = time.perf_counter() - begin
+
+    print(f"请求数[{args.count}]，并发[{args.concurrency}]，失败[{errors}]，耗时[{elapsed:.3f}s]，"
+          f"吞吐[{args.count / elapsed:.1f}req/s]")
+    for name, latencies in (("status", status_latencies), ("pong", pong_latencies)):
+        if latencies:
+            print(f"  {name}(ms)：p50[{percentile(latencies, 50):.3f}] p95[{percentile(latencies, 95):.3f}] "
+                  f"p99[{percentile(latencies, 99):.3f}] max[{max(latencies):.3f}]")
+    return 1 if errors else 0
+
+
+def run_startup(args):
+    from config import Config
+    config = Config.get_default_config()
+    config.update(Config.get_optional_config())
+    config.update(ip="127.0.0.1", port=0, server_icon=os.path.join(ROOT, "server-icon.png"))
+
+    imports, binds, walls = [], [], []
+    with tempfile.TemporaryDirectory() as directory:
+        #在临时目录中运行，日志等文件不会写入当前目录
+        with open(os.path.join(directory, "slp_config.json"), "w", encoding="utf8") as file:
+            json.dump(config, file, ensure_ascii=False)
+        for _ in range(args.count):
+            begin = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, ROOT], cwd=directory,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            walls.append((time.perf_counter() - begin) * 1000)
+            if result.returncode != 0:
+                print("启动失败")
+                return 1
+            imported, bound = result.stderr.strip().splitlines()[-1].split()
+            imports.append(float(imported) * 1000)
+            binds.append(float(bound) * 1000)
+
+    bind_p50 = percentile(binds, 50)
+    print(f"启动次数[{args.count}]")
+    print(f"  导入(ms)：p50[{percentile(imports, 50):.2f}] max[{max(imports):.2f}]")
+    print(f"  导入+监听(ms)：p50[{bind_p50:.2f}] max[{max(binds):.2f}]")
+    print(f"  进程总耗时(ms)：p50[{percentile(walls, 50):.2f}] max[{max(walls):.2f}]")
+    if args.budget > 0 and bind_p50 > args.budget:
+        print(f"超出启动时间预算：[{bind_p50:.2f}ms] > [{args.budget:.2f}ms]")
+        return 1
+    return 0
+
+
+def measure(wait_until):
+    """等待服务器状态稳定后返回(tracemalloc当前值, RSS, 虚拟内存)"""
+    import tracemalloc
+    from memory_usage import get_rss, get_vms
+    deadline = time.monotonic() + 10
+    while not wait_until() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    return tracemalloc.get_traced_memory()[0], get_rss() or 0, get_vms() or 0
+
+
+def run_memory(args):
+    import tracemalloc
+    from server_logger import ServerLogger
+    ServerLogger().configure(console=False, to_file=False)
+    from config import Config
+    from slp_server import SlpServer
+
+    config = Config.get_default_config()
+    config.update(Config.get_optional_config())
+    config.update(ip="127.0.0.1", port=0, server_icon=os.path.join(ROOT, "server-icon.png"))
+    config["socket"]["tcp_defer_accept"] = 0  # 空闲连接也需要被accept才能统计
+    config["memory"]["low_footprint"] = args.low_footprint
+
+    tracemalloc.start()
+    server = SlpServer(config)
+    server.start(max_threads=args.count + 1)
+    if not server.ready.wait(10):
+        print("启动失败")
+        return 1
+    port = server.listeners[0].port
+    server.renderer.get_snapshot()
+    base = measure(lambda: True)
+
+    #空闲连接：已连接但没有发送任何数据，工作线程阻塞在读取第一个字节
+    sockets = [socket.create_connection(("127.0.0.1", port)) for _ in range(args.count)]
+    idle = measure(lambda: server.connections >= args.count)
+
+    #活动连接：已完成握手与状态请求，等待客户端的ping
+    for sock in sockets:
+        sock.sendall(create_handshake("127.0.0.1", port, 0x01) + create_packet(b"\x00"))
+    for sock in sockets:
+        recv_packet(sock)
+    active = measure(lambda: True)
+
+    for sock in sockets:
+        sock.close()
+    server.stop()
+    tracemalloc.stop()
+
+    print(f"连接数[{args.count}]，低占用模式[{args.low_footprint}]")
+    for name, result in (("空闲连接", idle), ("活动连接", active)):
+        traced, rss, vms = ((value - base_value) / args.count for value, base_value in zip(result, base))
+        print(f"  {name}：tracemalloc[{traced:.0f}]bytes/conn，RSS[{rss:.0f}]bytes/conn，虚拟内存[{vms:.0f}]bytes/conn")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SLP服务器性能测试工具")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    latency = commands.add_parser("latency", help="测试状态查询延迟")
+    latency.add_argument("--host", default="127.0.0.1", help="目标服务器地址")
+    latency.add_argument("--port", type=int, default=25565, help="目标服务器端口")
+    latency.add_argument("-n", "--count", type=int, default=1000, help="请求次数")
+    latency.add_argument("-c", "--concurrency", type=int, default=1, help="并发数")
+    latency.add_argument("--client-nagle", action="store_true", help="客户端不设置TCP_NODELAY")
+    latency.set_defaults(func=run_latency)
+
+    startup = commands.add_parser("startup", help="测试冷启动耗时")
+    startup.add_argument("-n", "--count", type=int, default=10, help="启动次数")
+    startup.add_argument("--budget", type=float, default=300.0, help="导入+监听耗时p50的预算（毫秒），0为不检查")
+    startup.set_defaults(func=run_startup)
+
+    memory = commands.add_parser("memory", help="统计每个连接占用的内存")
+    memory.add_argument("-n", "--count", type=int, default=200, help="连接数")
+    memory.add_argument("--low-footprint", action="store_true", help="启用低占用模式")
+    memory.set_defaults(func=run_memory)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,29 +2,70 @@ import struct
 import socket
 import time
 import uuid
+import threading
 
+# 每个线程复用的接收缓冲区
+_local = threading.local()
 
-def read_exactly(sock, n, timeout=5):
-    """读取指定长度的数据，超时或连接关闭时抛出异常"""
+
+def read_available(sock, n, timeout):
+    """等待最多timeout秒，返回已到达的最多n字节数据，超时返回空bytes，连接关闭时抛出异常"""
+    sock.settimeout(timeout)
+    try:
+        chunk = sock.recv(n)
+    except socket.timeout:
+        return b""
+    if not chunk:
+        raise ConnectionError("连接已关闭")
+    return chunk
+
+
+def read_until_close(sock, n, timeout):
+    """读取数据直到对方关闭连接、读满n字节或超时，返回已读取的数据，不抛出超时与连接异常"""
     data = bytearray()
-    end_time = time.time() + timeout
-    while len(data) < n:
-        remaining = end_time - time.time()
-        if remaining <= 0:
-            raise socket.timeout(f'Timeout after {timeout} seconds')
-        sock.settimeout(remaining)
-        try:
+    end_time = time.monotonic() + timeout
+    try:
+        while len(data) < n:
+            remaining = end_time - time.monotonic()
+            if remaining <= 0:
+                break
+            sock.settimeout(remaining)
             chunk = sock.recv(n - len(data))
             if not chunk:
-                raise ConnectionError("连接已关闭")
-            data.extend(chunk)
-        except socket.timeout:
-            raise
-        except:
-            raise
+                break
+            data += chunk
+    except OSError:#包括socket.timeout与ConnectionError
+        pass
     return bytes(data)
 
 
+def get_recv_buffer(n):
+    """返回当前线程的接收缓冲区，长度不足时扩大"""
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None or len(buffer) < n:
+        buffer = bytearray(max(n, 128))
+        _local.buffer = buffer
+    return buffer
+
+
+def read_exactly(sock, n, timeout=5):
+    """读取指定长度的数据，超时或连接关闭时抛出异常"""
+    #直接接收到复用的缓冲区，只在返回时复制一次
+    with memoryview(get_recv_buffer(n)) as view:
+        received = 0
+        end_time = time.monotonic() + timeout
+        while received < n:
+            remaining = end_time - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout(f'Timeout after {timeout} seconds')
+            sock.settimeout(remaining)
+            count = sock.recv_into(view[received:n], n - received)
+            if count == 0:
+                raise ConnectionError("连接已关闭")
+            received += count
+        return bytes(view[:n])
+
+
 def format_hex(data, sep=' ', prefix='', case='upper'):
     """
     格式化字节数组为十六进制字符串
@@ -71,6 +112,21 @@ class BytesReader:
         
         return result
     
+    def read_varlong(self):
+        result = 0
+        
+        for j in range(11):
+            if j >= 10:#同varint，最多10个字节共70个bits，刚好大于64
+                raise BytesReaderError("Insufficient data for varlong")
+            
+            byte_in = self.data[self.i]
+            self.i += 1
+            result |= (byte_in & 0x7F) << (j * 7)
+            if (byte_in & 0x80) != 0x80:
+                break
+        
+        return result
+    
     def read_str(self):
         length = self.read_varint()
         
@@ -79,7 +135,10 @@ class BytesReader:
         
         old_i = self.i
         self.i += length
-        return self.data[old_i:self.i].decode('utf-8')
+        try:
+            return self.data[old_i:self.i].decode('utf-8')
+        except UnicodeDecodeError:
+            raise BytesReaderError("Invalid utf-8 string")
     
     def read_bytes(self, size):
         if self.i + size > len(self.data):
@@ -161,14 +220,28 @@ def write_utf(byte:bytearray, value):
     write_varint(byte, len(value))
     byte.extend(value.encode('utf-8'))
 
-def write_str_response(client_socket, packet_id, response):
+def create_str_packet(packet_id, response):
+    """创建完整的字符串数据包（长度+packet_id+字符串），可预先生成后直接发送"""
     # 写入包头：packet_id
     response_array = bytearray()
     write_byte(response_array, packet_id)
     #写入字符串
     write_utf(response_array, response)
-    #写入长度
-    length = bytearray()
-    write_varint(length, len(response_array))
+    #在前面写入长度，合成一个缓冲区，只需一次send
+    packet = bytearray()
+    write_varint(packet, len(response_array))
+    packet += response_array
+    return bytes(packet)
+
+def create_legacy_kick_packet(message):
+    """创建1.6及以前版本的踢出数据包（packet id 0xFF + 字符数 + UTF-16BE字符串），用于旧版ping响应"""
+    send_bytes = message.encode('utf-16-be')
+    packet = bytearray()
+    write_byte(packet, 0xFF)
+    write_ushort(packet, len(send_bytes) // 2)  # 字符长度
+    packet += send_bytes
+    return bytes(packet)
+
+def write_str_response(client_socket, packet_id, response):
     #发送数据
-    client_socket.sendall(bytes(length) + bytes(response_array))
\ No newline at end of file
+    client_socket.sendall(create_str_packet(packet_id, response))
\ No newline at end of file
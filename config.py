@@ -24,12 +24,77 @@ class Config:
             "samples": ["§f服务器正在维护", "§f请等待服主通知"]
         }
     
+    @staticmethod
+    def get_optional_config():
+        #可选配置段：缺失时使用默认值，存在时校验类型，并用默认值补齐缺失的子项
+        return {
+            # 监听地址列表，每项为{"ip": "::", "port": 25565, "dual_stack": true}，为空时使用ip与port
+            "listen": [],
+            "stats_interval": 60,  # 秒，输出各监听地址连接统计的间隔，0为只在退出时输出
+            "capture": {
+                "enabled": False,
+                "file": "captures/traffic.slpcap"
+            },
+            "socket": {
+                "tcp_nodelay": True,      # 关闭Nagle算法，小响应包立即发出
+                "tcp_defer_accept": 5,    # 秒，客户端发送数据前不唤醒accept（仅Linux），0为关闭
+                "tcp_fastopen": 0,        # TFO队列长度，0为关闭
+                "rcvbuf": 0,              # 接收缓冲区大小，0为系统默认
+                "sndbuf": 0,              # 发送缓冲区大小，0为系统默认
+                "backlog": 128,           # 挂起连接队列长度
+                "linger_rst": True        # 对发送无效数据或超时的客户端以RST关闭连接
+            },
+            "memory": {
+                "low_footprint": False,       # 低占用模式：工作线程使用thread_stack_size大小的线程栈
+                "thread_stack_size": 262144,  # 字节，最小32768
+                "budget_mb": 0,               # 进程内存预算（MiB），超出后拒绝新连接，0为不限制
+                "max_pending": 0              # 等待工作线程的连接数上限，超出后拒绝新连接，0为不限制
+            },
+            "players": {
+                "page_size": 0,           # 每页显示的样本数，0为全部显示在一页
+                "rotate_interval": 5,     # 秒，多页时轮换的间隔
+                "max": -1,                # 最大人数，-1为与在线人数相同
+                "online_mode": "samples", # samples(样本总数)/fixed(固定值)/random(随机)/connections(当前连接数)
+                "online": 0,              # fixed模式的在线人数，random模式的下限
+                "online_max": 0           # random模式的上限
+            },
+            "schedule": {
+                "enabled": False,
+                # 档案中的motd/version_text/kick_message覆盖基础配置，可使用{countdown}与{target}占位符
+                "profiles": {
+                    "maintenance": {
+                        "motd": "§c服务器正在维护！\n§e预计{target}恢复，剩余{countdown}",
+                        "kick_message": "§4§l很抱歉，服务器正在维护中，暂时无法进入！\n\n§e预计{target}恢复，剩余{countdown}"
+                    },
+                    "final_warning": {
+                        "motd": "§6服务器即将恢复！\n§e剩余{countdown}",
+                        "version_text": "§6即将恢复..."
+                    },
+                    "back_soon": {
+                        "motd": "§a服务器维护完成，正在启动\n§e请稍后刷新"
+                    }
+                },
+                # 时间格式为"HH:MM"（每天）或"YYYY-MM-DD HH:MM"（指定日期），target为倒计时目标，默认为end
+                "windows": [
+                    {"start": "12:00", "end": "13:50", "profile": "maintenance", "target": "14:00"},
+                    {"start": "13:50", "end": "14:00", "profile": "final_warning"},
+                    {"start": "14:00", "end": "14:10", "profile": "back_soon"}
+                ]
+            }
+        }
+    
     def _use_temp_default(self):
         self.config = self.get_default_config()
+        self._use_optional_default()
         logger.warning("正在使用临时默认配置（不会修改原配置文件）")
 
+    def _use_optional_default(self):
+        for key, default_value in self.get_optional_config().items():
+            self.config.setdefault(key, default_value)
+
     def _create_config_file(self, filename):
         default_config = self.get_default_config()
+        default_config.update(self.get_optional_config())
         try:
             with open(filename, "w", encoding="utf8") as file:
                 json.dump(default_config, file,
@@ -77,6 +142,32 @@ class Config:
                 validation_errors.append(
                     f"配置项 '{key}' 类型错误 - 需要: {expected_type}, 实际: {actual_type}"
                 )
+        
+        # 检查可选项，缺失的可选项与子项使用默认值
+        for key, default_value in self.get_optional_config().items():
+            if key not in user_config:
+                user_config[key] = default_value
+                continue
+            
+            user_value = user_config[key]
+            if not isinstance(user_value, type(default_value)):
+                expected_type = type(default_value).__name__
+                actual_type = type(user_value).__name__
+                validation_errors.append(
+                    f"配置项 '{key}' 类型错误 - 需要: {expected_type}, 实际: {actual_type}"
+                )
+                continue
+            
+            if isinstance(default_value, dict):
+                for sub_key, sub_default in default_value.items():
+                    if sub_key not in user_value:
+                        user_value[sub_key] = sub_default
+                    elif not isinstance(user_value[sub_key], type(sub_default)):
+                        expected_type = type(sub_default).__name__
+                        actual_type = type(user_value[sub_key]).__name__
+                        validation_errors.append(
+                            f"配置项 '{key}.{sub_key}' 类型错误 - 需要: {expected_type}, 实际: {actual_type}"
+                        )
 
         if validation_errors:
             for error in validation_errors:
@@ -0,0 +1,312 @@
+import os
+import sys
+import time
+import socket
+import random
+import struct
+import argparse
+
+from collections import namedtuple
+from byte_utils import *
+
+'''
+    解析器模糊测试：用生成与变异的输入驱动handle_socket（含handle_head、handle_login等解析路径），
+    检查每个输入的CPU耗时、占用连接的时间（模拟时钟）与读取的字节数都在预算内，并输出最慢的输入
+    模拟客户端可以在每次发送前等待到接近服务器设置的超时，用于检查缓慢逐字节发送的客户端占用工作线程的最长时间
+        python fuzz.py -n 20000 --seed 1
+        python fuzz.py --corpus captures/traffic.slpcap --cpu-budget 20 --time-budget 5 --bytes-budget 2048
+'''
+
+
+class FuzzClock:
+    """模拟时钟：替换byte_utils与slp_server使用的time模块，只在FuzzSocket模拟等待时前进，不实际等待"""
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FuzzSocket:
+    """
+        模拟客户端socket：按随机的分块大小返回输入数据，数据读完后模拟客户端超时或断开
+        每次返回数据前客户端等待pace倍的当前超时时间，等待与超时都计入模拟时钟
+    """
+    def __init__(self, data, chunk, on_end, pace, clock):
+        self.data = data
+        self.i = 0
+        self.chunk = chunk      # 每次recv最多返回的字节数
+        self.on_end = on_end    # "timeout"或"close"
+        self.pace = pace        # 0为立即发送，接近1为在超时前一刻才发送
+        self.clock = clock
+        self.begin = clock.now
+        self.timeout = None
+        self.sent = bytearray()
+        self.bytes_read = 0
+        self.recv_calls = 0
+        self.closed = False
+
+    @property
+    def elapsed(self):
+        """连接占用的模拟时间（秒）"""
+        return self.clock.now - self.begin
+
+    def _wait(self, seconds):
+        if self.timeout is None:
+            #阻塞读取没有超时，客户端可以无限期占用连接
+            self.clock.now = float("inf")
+        else:
+            self.clock.now += seconds
+
+    def _take(self, n):
+        self.recv_calls += 1
+        if self.i >= len(self.data):
+            if self.on_end == "timeout":
+                self._wait(self.timeout)
+                raise socket.timeout("fuzz timeout")
+            return b""
+        if self.pace > 0:
+            self._wait(self.pace * self.timeout if self.timeout is not None else 0)
+        n = min(n, self.chunk)
+        chunk = self.data[self.i:self.i + n]
+        self.i += len(chunk)
+        self.bytes_read += len(chunk)
+        return chunk
+
+    def recv(self, bufsize, *args):
+        return self._take(bufsize)
+
+    def recv_into(self, buffer, nbytes=0, *args):
+        chunk = self._take(nbytes or len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def sendall(self, data, *args):
+        self.sent += data
+
+    def settimeout(self, timeout):
+        if timeout is not None and timeout <= 0:
+            raise ValueError(f"fuzz: invalid timeout [{timeout}]")
+        self.timeout = timeout
+
+    def setsockopt(self, *args):
+        pass
+
+    def shutdown(self, how):
+        pass
+
+    def fileno(self):
+        return -1 if self.closed else 0
+
+    def close(self):
+        self.closed = True
+
+
+# 语法生成部分
+def varint(value):
+    data = bytearray()
+    write_varint(data, value & 0xFFFFFFFF)
+    return bytes(data)
+
+
+def packet(body):
+    return varint(len(body)) + body
+
+
+def fuzz_varint(rng):
+    return rng.choice((
+        lambda: varint(rng.randint(0, 127)),
+        lambda: varint(rng.randint(0, 0xFFFFFFFF)),
+        lambda: b"\x80" * rng.randint(1, 8),               # 未结束的varint
+        lambda: b"\xff" * rng.randint(4, 6) + b"\x01",     # 超长varint
+        lambda: b"\x80\x00",                               # 非最短编码
+    ))()
+
+
+def fuzz_str(rng):
+    text = rng.choice((b"", b"localhost", b"a" * rng.randint(0, 300), bytes(rng.randrange(256) for _ in range(rng.randint(0, 20))),
+                       "服务器".encode("utf-8"), b"\xc3\x28", b"host\x00FML3\x00"))
+    length = rng.choice((len(text), len(text), rng.randint(0, 0xFFFF), 0x7FFFFFFF))
+    return varint(length) + text
+
+
+def fuzz_uuid(rng):
+    return bytes(rng.randrange(256) for _ in range(rng.choice((16, 16, 15, 8, 0))))
+
+
+def gen_handshake(rng):
+    body = b"\x00" + fuzz_varint(rng) + fuzz_str(rng) + struct.pack(">H", rng.randrange(0x10000)) + \
+        rng.choice((b"\x01", b"\x02", b"\x03", bytes((rng.randrange(256),))))
+    return packet(body)
+
+
+def gen_status(rng):
+    return gen_handshake(rng) + rng.choice((packet(b"\x00"), packet(b"\x00\x00"), b"")) + \
+        rng.choice((packet(b"\x01" + struct.pack(">q", rng.getrandbits(63))), packet(b"\x01\x00"), b""))
+
+
+def gen_login(rng):
+    name = fuzz_str(rng)
+    tail = rng.choice((b"", b"\x00", b"\x01" + fuzz_uuid(rng), fuzz_uuid(rng), bytes((rng.randrange(256),)) + fuzz_uuid(rng)))
+    return gen_handshake(rng) + packet(b"\x00" + name + tail)
+
+
+def gen_legacy(rng):
+    host = "".join(rng.choice("abc.1") for _ in range(rng.randint(0, 40))).encode("utf-16-be")
+    ping_host = struct.pack(">H", rng.choice((11, 11, 0, 0xFFFF))) + "MC|PingHost".encode("utf-16-be") + \
+        struct.pack(">H", rng.choice((7 + len(host), rng.randrange(0x10000)))) + bytes((rng.randrange(256),)) + \
+        struct.pack(">H", len(host) // 2) + host + struct.pack(">i", rng.randrange(-2 ** 31, 2 ** 31))
+    return rng.choice((b"\xfe", b"\xfe\x01", b"\xfe\x01\xfa" + ping_host, b"\xfe" + bytes((rng.randrange(256),))))
+
+
+def gen_random(rng):
+    return bytes(rng.randrange(256) for _ in range(rng.randint(0, 128)))
+
+
+GENERATORS = (gen_handshake, gen_status, gen_login, gen_legacy, gen_random)
+
+
+# 变异部分
+def mutate(rng, data, corpus):
+    data = bytearray(data)
+    for _ in range(rng.randint(1, 4)):
+        op = rng.randrange(6)
+        if op == 0 and data:    # 翻转位
+            i = rng.randrange(len(data))
+            data[i] ^= 1 << rng.randrange(8)
+        elif op == 1 and data:  # 替换为边界值
+            data[rng.randrange(len(data))] = rng.choice((0x00, 0x01, 0x7F, 0x80, 0xFE, 0xFF))
+        elif op == 2:           # 插入
+            i = rng.randint(0, len(data))
+            data[i:i] = bytes(rng.randrange(256) for _ in range(rng.randint(1, 8)))
+        elif op == 3 and data:  # 删除
+            i = rng.randrange(len(data))
+            del data[i:i + rng.randint(1, 8)]
+        elif op == 4 and data:  # 截断
+            del data[rng.randrange(len(data)):]
+        elif op == 5 and corpus:  # 拼接另一个输入
+            other = rng.choice(corpus)
+            data = data[:rng.randint(0, len(data))] + other[rng.randint(0, len(other)):]
+    return bytes(data)
+
+
+def load_corpus(filenames):
+    from traffic_capture import read_capture
+    corpus = []
+    for filename in filenames:
+        for connections in read_capture(filename):
+            for connection in connections:
+                data = b"".join(event.data for event in connection.inbound())
+                if data:
+                    corpus.append(data)
+    return corpus
+
+
+def create_server(errors, clock):
+    import byte_utils
+    import slp_server
+    # 服务器的超时计算使用模拟时钟
+    byte_utils.time = clock
+    slp_server.time = clock
+    from server_logger import ServerLogger
+    # 关闭日志输出，只测量解析本身
+    logger = ServerLogger()
+    logger.configure(console=False, to_file=False)
+    # handle_socket会捕获全部异常，意外异常只会记录为error日志，在此收集
+    logger.error = errors.append
+    from config import Config
+    from slp_server import SlpServer
+    config = Config.get_default_config()
+    config.update(Config.get_optional_config())
+    config["server_icon"] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server-icon.png")
+    return SlpServer(config)
+
+
+FuzzResult = namedtuple('FuzzResult', ['index', 'data', 'cpu_time', 'wall_time', 'bytes_read', 'recv_calls'])
+
+
+def format_result(result):
+    data = result.data
+    return (f"#{result.index} cpu[{result.cpu_time * 1000:.3f}ms] wall[{result.wall_time:.3f}s] "
+            f"read[{result.bytes_read}] recv[{result.recv_calls}] [{format_hex(data[:48])}{' ...' if len(data) > 48 else ''}]")
+
+
+def run_one(server, data, chunk, on_end, pace, clock):
+    sock = FuzzSocket(data, chunk, on_end, pace, clock)
+    begin = time.thread_time()
+    server.handle_socket(sock)
+    return time.thread_time() - begin, sock
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解析器模糊测试")
+    parser.add_argument("-n", "--count", type=int, default=10000, help="测试的输入数量")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，用于复现")
+    parser.add_argument("--corpus", nargs="*", default=[], help="作为变异种子的抓包文件")
+    parser.add_argument("--cpu-budget", type=float, default=20.0, help="单个输入的CPU耗时预算（毫秒）")
+    parser.add_argument("--time-budget", type=float, default=5.0, help="单个输入占用连接的时间预算（秒，模拟时钟）")
+    parser.add_argument("--bytes-budget", type=int, default=2048, help="单个输入的读取字节数预算")
+    parser.add_argument("--top", type=int, default=10, help="输出最慢的输入数量")
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    corpus = load_corpus(args.corpus)
+    errors = []
+    clock = FuzzClock()
+    server = create_server(errors, clock)
+    server.renderer.render()  # 提前渲染，不计入第一个输入的耗时
+
+    results = []
+    violations = []
+    crashes = []
+    begin = time.perf_counter()
+    for index in range(args.count):
+        if corpus and rng.random() < 0.5:
+            data = mutate(rng, rng.choice(corpus), corpus)
+        else:
+            data = rng.choice(GENERATORS)(rng)
+            if rng.random() < 0.5:
+                data = mutate(rng, data, corpus)
+        chunk = rng.choice((1, 2, 7, 64, 4096))
+        on_end = rng.choice(("timeout", "close"))
+        pace = rng.choice((0.0, 0.0, 0.5, 0.99))
+        cpu_time, sock = run_one(server, data, chunk, on_end, pace, clock)
+
+        result = FuzzResult(index, data, cpu_time, sock.elapsed, sock.bytes_read, sock.recv_calls)
+        results.append(result)
+        #模拟时钟的累加存在浮点误差
+        if cpu_time * 1000 > args.cpu_budget or result.wall_time > args.time_budget + 1e-6 or \
+                result.bytes_read > args.bytes_budget:
+            violations.append(result)
+        if errors:
+            crashes.append((index, data, errors[-1]))
+            errors.clear()
+    elapsed = time.perf_counter() - begin
+
+    print(f"种子[{seed}]，输入数[{args.count}]，耗时[{elapsed:.2f}s]，"
+          f"最大读取字节数[{max(result.bytes_read for result in results)}]，"
+          f"最大占用时间[{max(result.wall_time for result in results):.3f}s]，"
+          f"最大recv次数[{max(result.recv_calls for result in results)}]")
+    print(f"CPU耗时最长的[{min(args.top, len(results))}]个输入：")
+    for result in sorted(results, key=lambda result: result.cpu_time, reverse=True)[:args.top]:
+        print(f"  {format_result(result)} len[{len(result.data)}]")
+    print(f"占用时间最长的[{min(args.top, len(results))}]个输入：")
+    for result in sorted(results, key=lambda result: result.wall_time, reverse=True)[:args.top]:
+        print(f"  {format_result(result)} len[{len(result.data)}]")
+    if crashes:
+        print(f"引发意外异常的输入：[{len(crashes)}]")
+        for index, data, error in crashes[:args.top]:
+            print(f"  #{index} [{format_hex(data[:48])}]\n{error}")
+    if violations:
+        print(f"超出预算的输入：[{len(violations)}]（cpu预算[{args.cpu_budget}ms]，"
+              f"占用时间预算[{args.time_budget}s]，读取预算[{args.bytes_budget}]bytes）")
+        for result in violations[:args.top]:
+            print(f"  {format_result(result)}")
+    if crashes or violations:
+        return 1
+    print("全部输入均在预算内")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import datetime
+
+from server_logger import ServerLogger
+
+logger = ServerLogger()
+
+'''
+    维护时间表：按时间窗口切换配置档案（profile），档案中的motd/version_text/kick_message会覆盖基础配置
+    时间格式：
+        "HH:MM"：每天重复，结束时间不大于开始时间时视为跨过零点
+        "YYYY-MM-DD HH:MM"：指定日期时间，只生效一次
+    文本中可使用的占位符：
+        {countdown}：距离目标时间的倒计时，目标时间为窗口的target，未设置时为窗口结束时间
+        {target}：目标时间（HH:MM）
+'''
+PROFILE_KEYS = ("motd", "version_text", "kick_message")
+
+
+def parse_time(text):
+    """返回(是否为每日时间, datetime.time 或 datetime.datetime)"""
+    if not isinstance(text, str):
+        raise ValueError(f"时间必须为字符串，实际为[{type(text).__name__}]")
+    text = text.strip()
+    try:
+        return True, datetime.datetime.strptime(text, "%H:%M").time()
+    except ValueError:
+        return False, datetime.datetime.strptime(text, "%Y-%m-%d %H:%M")
+
+
+def format_countdown(seconds):
+    seconds = max(int(seconds), 0)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours > 0:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+class ScheduleWindow:
+    def __init__(self, window):
+        self.profile = window["profile"]
+        self.daily, self.start = parse_time(window["start"])
+        end_daily, self.end = parse_time(window["end"])
+        if end_daily != self.daily:
+            raise ValueError("start与end的时间格式必须一致")
+        self.target = parse_time(window["target"]) if "target" in window else None
+
+    def occurrence(self, now):
+        """返回包含now的这次窗口的(开始, 结束)，不在窗口内时返回None"""
+        if not self.daily:
+            return (self.start, self.end) if self.start <= now < self.end else None
+        # 每日窗口：检查今天和昨天开始的两次（跨零点的窗口可能从昨天开始）
+        for days in (0, 1):
+            date = now.date() - datetime.timedelta(days=days)
+            start = datetime.datetime.combine(date, self.start)
+            end = datetime.datetime.combine(date, self.end)
+            if end <= start:
+                end += datetime.timedelta(days=1)
+            if start <= now < end:
+                return start, end
+        return None
+
+    def resolve_target(self, start, end):
+        if self.target is None:
+            return end
+        daily, target = self.target
+        if not daily:
+            return target
+        # 每日目标时间：取窗口开始之后第一次到达的该时间
+        result = datetime.datetime.combine(start.date(), target)
+        if result < start:
+            result += datetime.timedelta(days=1)
+        return result
+
+
+class Schedule:
+    def __init__(self, schedule_config):
+        self.enabled = schedule_config["enabled"]
+        self.profiles = {}
+        self.windows = []
+        if not self.enabled:
+            return
+        for name, profile in schedule_config["profiles"].items():
+            if not isinstance(profile, dict) or not all(isinstance(text, str) for text in profile.values()):
+                logger.error(f"维护时间表档案[{name}]无效，已忽略: 档案必须为文本键值对")
+                continue
+            self.profiles[name] = profile
+        for index, window in enumerate(schedule_config["windows"]):
+            try:
+                if window["profile"] not in self.profiles:
+                    raise ValueError(f"未定义的profile[{window["profile"]}]")
+                self.windows.append(ScheduleWindow(window))
+            except (KeyError, ValueError, TypeError) as e:
+                logger.error(f"维护时间表第[{index}]项无效，已忽略: {str(e)}")
+
+    def resolve(self, now):
+        """返回当前生效的(档案, 目标时间)，不在任何窗口内时返回(None, None)，窗口重叠时取靠前的一项"""
+        for window in self.windows:
+            occurrence = window.occurrence(now)
+            if occurrence is not None:
+                return self.profiles[window.profile], window.resolve_target(*occurrence)
+        return None, None
+
+    def apply(self, config, now):
+        """返回当前时间应使用的文本，已替换占位符"""
+        profile, target = self.resolve(now)
+        texts = {key: config[key] for key in PROFILE_KEYS}
+        if profile is None:
+            return texts
+        for key in PROFILE_KEYS:
+            if key in profile:
+                texts[key] = profile[key]
+        countdown = format_countdown((target - now).total_seconds())
+        target_text = target.strftime("%H:%M")
+        return {key: text.replace("{countdown}", countdown).replace("{target}", target_text)
+                for key, text in texts.items()}
@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import threading
+
+'''
+    进程内存统计，用于内存预算与低占用模式
+'''
+
+
+def _get_rss_windows():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+
+def get_rss():
+    """返回当前进程的常驻内存（字节），无法获取时返回None"""
+    try:
+        if sys.platform == "win32":
+            return _get_rss_windows()
+        with open("/proc/self/statm", "rb") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, ImportError):
+        return None
+
+
+def get_vms():
+    """返回当前进程的虚拟内存大小（字节，包含已保留但未使用的线程栈），仅支持Linux，无法获取时返回None"""
+    try:
+        with open("/proc/self/statm", "rb") as file:
+            return int(file.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MemoryGuard:
+    """按固定间隔检查进程内存是否超出预算，两次检查之间使用缓存的结果"""
+    def __init__(self, budget, interval=1.0):
+        self.budget = budget  # 字节，0为不限制
+        self.interval = interval
+        self.rss = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def enabled(self):
+        return self.budget > 0
+
+    def over_budget(self):
+        if self.budget <= 0:
+            return False
+        now = time.monotonic()
+        if now - self._checked >= self.interval:
+            with self._lock:
+                if now - self._checked >= self.interval:
+                    self.rss = get_rss()
+                    self._checked = now
+        return self.rss is not None and self.rss > self.budget
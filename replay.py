@@ -0,0 +1,131 @@
+import sys
+import time
+import socket
+import argparse
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from traffic_capture import read_capture
+
+'''
+    抓包回放工具：将抓包文件中记录的客户端数据按原始时序重新发送到本地服务器，
+    并将服务器的响应与抓包时记录的响应逐字节比较，用于性能回归测试
+    用法：python replay.py captures/traffic.slpcap --speed 1 | --speed 10 | --speed 0(不等待，最大速度)
+'''
+
+
+class ReplayResult:
+    def __init__(self, connection):
+        self.connection = connection
+        self.elapsed = 0.0
+        self.received = b""
+        self.error = None
+
+    @property
+    def matched(self):
+        return self.error is None and self.received == self.connection.outbound_bytes()
+
+
+def sleep_until(deadline):
+    remaining = deadline - time.perf_counter()
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+def replay_connection(connection, host, port, speed, timeout):
+    result = ReplayResult(connection)
+    begin = time.perf_counter()
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            # 按原始间隔发送客户端数据
+            for event in connection.inbound():
+                if speed > 0:
+                    sleep_until(begin + event.time / speed)
+                try:
+                    sock.sendall(event.data)
+                except (BrokenPipeError, ConnectionResetError):
+                    break  # 服务器已提前断开，继续读取已收到的响应
+            # 读取服务器的全部响应直到断开
+            received = bytearray()
+            while True:
+                try:
+                    chunk = sock.recv(65536)
+                except ConnectionResetError:
+                    break
+                if not chunk:
+                    break
+                received.extend(chunk)
+            result.received = bytes(received)
+    except Exception as e:
+        result.error = e
+    result.elapsed = time.perf_counter() - begin
+    return result
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def replay_session(connections, args):
+    results = []
+    lock = threading.Lock()
+
+    def run(connection):
+        result = replay_connection(connection, args.host, args.port, args.speed, args.timeout)
+        with lock:
+            results.append(result)
+
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for connection in connections:
+            # 按原始的连接建立时间提交
+            if args.speed > 0:
+                sleep_until(begin + connection.start / args.speed)
+            executor.submit(run, connection)
+    return results, time.perf_counter() - begin
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放抓包文件并比较服务器响应")
+    parser.add_argument("capture", help="抓包文件路径")
+    parser.add_argument("--host", default="127.0.0.1", help="目标服务器地址")
+    parser.add_argument("--port", type=int, default=25565, help="目标服务器端口")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，0为不等待（最大速度）")
+    parser.add_argument("--workers", type=int, default=32, help="并发连接数上限")
+    parser.add_argument("--timeout", type=float, default=10.0, help="单个连接的超时时间（秒）")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出每个不一致连接的详细信息")
+    args = parser.parse_args()
+
+    sessions = read_capture(args.capture)
+    total = mismatched = 0
+    for index, connections in enumerate(sessions):
+        if not connections:
+            continue
+        results, elapsed = replay_session(connections, args)
+        latencies = [result.elapsed * 1000 for result in results]
+        failed = [result for result in results if not result.matched]
+        total += len(results)
+        mismatched += len(failed)
+
+        print(f"会话[{index}]：连接数[{len(results)}]，耗时[{elapsed:.3f}s]，"
+              f"吞吐[{len(results) / elapsed if elapsed > 0 else 0:.1f}conn/s]")
+        print(f"  连接耗时(ms)：p50[{percentile(latencies, 50):.2f}] p95[{percentile(latencies, 95):.2f}] "
+              f"p99[{percentile(latencies, 99):.2f}] max[{max(latencies):.2f}]")
+        print(f"  响应不一致：[{len(failed)}]")
+        if args.verbose:
+            for result in failed:
+                connection = result.connection
+                reason = result.error if result.error is not None else \
+                    f"期望[{len(connection.outbound_bytes())}]bytes，实际[{len(result.received)}]bytes"
+                print(f"    conn[{connection.conn_id}] {connection.peer}：{reason}")
+
+    print(f"总计：连接数[{total}]，响应不一致[{mismatched}]")
+    return 1 if mismatched else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,10 +9,6 @@ import atexit
 
 from enum import IntEnum
 from collections import namedtuple
-from colorama import init
-
-# 初始化colorama
-init()
 
 
 class LogLevel(IntEnum):
@@ -49,25 +45,75 @@ class ServerLogger:
         self._safe_shutdown()
     
     def _init_logger(self):
-        """初始化日志系统"""
-        # 确保logs目录存在
-        os.makedirs('logs', exist_ok=True)
-        
-        # 初始化日志文件
-        self.current_base_date = datetime.date.today().strftime("%Y-%m-%d")
-        max_index = self._find_max_index(self.current_base_date)
-        filename = os.path.join('logs', f"{self.current_base_date}-{max_index + 1}.log")
-        self.log_file = open(filename, "a", buffering=1, encoding="utf-8")
-        
-        # 初始化队列和后台线程
-        self._log_queue = queue.Queue(maxsize=1024)
+        """初始化日志设置，日志文件与后台线程延迟到第一次输出日志时创建"""
+        self.log_dir = 'logs'
+        self.console = True
+        self.to_file = True
+        self._color = False  # 控制台是否输出颜色，在启动时确定
+        self._log_queue = None
+        self._worker_thread = None
+        self._started = False
         self._running = True
-        self._worker_thread = threading.Thread(
-            target=self._process_logs,
-            name="LogWorker",
-            daemon=True  # 必须为true，防止死锁
-        )
-        self._worker_thread.start()
+    
+    def configure(self, log_dir=None, console=None, to_file=None):
+        """在第一次输出日志前修改设置，已启动时返回False"""
+        with self._lock:
+            if self._started:
+                return False
+            if log_dir is not None:
+                self.log_dir = log_dir
+            if console is not None:
+                self.console = console
+            if to_file is not None:
+                self.to_file = to_file
+            return True
+    
+    @staticmethod
+    def _init_console():
+        """
+            返回控制台是否输出颜色：输出被重定向到文件或管道时不输出颜色，
+            仅在Windows控制台下加载colorama，其它终端原生支持ANSI颜色
+        """
+        if sys.stdout is None or not sys.stdout.isatty():
+            return False
+        if sys.platform != "win32":
+            return True
+        try:
+            from colorama import init
+        except ImportError:
+            return False
+        init()
+        return True
+    
+    def _start(self):
+        """启动日志系统"""
+        with self._lock:
+            if self._started:
+                return
+            
+            if self.console:
+                self._color = self._init_console()
+            
+            if self.to_file:
+                # 确保日志目录存在
+                os.makedirs(self.log_dir, exist_ok=True)
+                
+                # 初始化日志文件
+                self.current_base_date = datetime.date.today().strftime("%Y-%m-%d")
+                max_index = self._find_max_index(self.log_dir, self.current_base_date)
+                filename = os.path.join(self.log_dir, f"{self.current_base_date}-{max_index + 1}.log")
+                self.log_file = open(filename, "a", buffering=1, encoding="utf-8")
+                
+                # 初始化队列和后台线程
+                self._log_queue = queue.Queue(maxsize=1024)
+                self._worker_thread = threading.Thread(
+                    target=self._process_logs,
+                    name="LogWorker",
+                    daemon=True  # 必须为true，防止死锁
+                )
+                self._worker_thread.start()
+            
+            self._started = True
     
     def _safe_shutdown(self):
         """安全关闭日志系统"""
@@ -77,6 +123,10 @@ class ServerLogger:
         # 设置标签防止继续插入
         self._running = False
         
+        # 未启动或未写入文件时无需等待
+        if self._log_queue is None:
+            return
+        
         # 发送终止信号通知工作线程退出
         self._log_queue.put(None)
         
@@ -92,20 +142,20 @@ class ServerLogger:
             self.log_file.close()
     
     @staticmethod
-    def _find_max_index(base_date: str) -> int:
+    def _find_max_index(log_dir: str, base_date: str) -> int:
         """查找当前日期的最大文件索引"""
         pattern = re.compile(r"^(\d{4}-\d{2}-\d{2})-(\d+)\.log$")
         max_index = 0
         
         try:
-            for filename in os.listdir('logs'):
+            for filename in os.listdir(log_dir):
                 match = pattern.match(filename)
                 if match:
                     file_date, index_str = match.groups()
                     if file_date == base_date:
                         max_index = max(max_index, int(index_str))
         except FileNotFoundError:
-            pass  # 如果logs目录不存在，直接返回0
+            pass  # 如果日志目录不存在，直接返回0
         
         return max_index
     
@@ -124,11 +174,11 @@ class ServerLogger:
     def _rotate_log_file(self, new_date):
         """切换日志文件到新日期"""
         try:
-            max_index = self._find_max_index(new_date)
-            filename = os.path.join('logs', f"{new_date}-{max_index + 1}.log")
+            max_index = self._find_max_index(self.log_dir, new_date)
+            filename = os.path.join(self.log_dir, f"{new_date}-{max_index + 1}.log")
             tmp_log_file = open(filename, "a", buffering=1, encoding="utf-8")
         except Exception as e:
-            sys.stderr.writer(f"日志文件切换失败: {str(e)}，新日期应为：[{new_date}]")
+            sys.stderr.write(f"日志文件切换失败: {str(e)}，新日期应为：[{new_date}]")
             return#直接返回
         #执行切换
         if hasattr(self, 'log_file') and self.log_file:
@@ -154,6 +204,8 @@ class ServerLogger:
     def _log(self, level: LogLevel, message: str):
         if not self._running:  # 防止停止过程插入消息
             return
+        if not self._started:  # 第一次输出日志时启动
+            self._start()
         #同步锁
         with self._console_lock:
             timestamp = datetime.datetime.now()
@@ -164,9 +216,14 @@ class ServerLogger:
             log_line = f"[{time_str}] [{thread_info}/{config.name}]: {message}\n"
             
             # 控制台输出
-            sys.stdout.write(f"{config.color}{log_line}\033[0m")
+            if self.console:
+                if self._color:
+                    sys.stdout.write(f"{config.color}{log_line}\033[0m")
+                else:
+                    sys.stdout.write(log_line)
             #插入到写入队列
-            self._log_queue.put(log_line)
+            if self._log_queue is not None:
+                self._log_queue.put(log_line)
     
     # 日志级别方法
     def info(self, message: str):
@@ -1,9 +1,7 @@
 import time
 import socket
-import json
-import os.path
-import base64
-import uuid
+import struct
+import selectors
 import threading
 import traceback
 
@@ -11,6 +9,9 @@ import traceback
 from enum import IntEnum
 from byte_utils import *
 from server_logger import ServerLogger
+from traffic_capture import TrafficCapture
+from status_renderer import StatusRenderer
+from memory_usage import MemoryGuard
 from concurrent.futures import ThreadPoolExecutor
 
 logger = ServerLogger()
@@ -23,53 +24,97 @@ class REQUEST(IntEnum):
     TRANSFER = 3
     UNKNOWN = 4
 
+class LEGACY(IntEnum):
+    V1_4 = 0  # 1.4~1.5：FE 01
+    V1_6 = 1  # 1.6：FE 01 FA MC|PingHost ...
+
+# 0xFE之后的数据前缀，按顺序匹配（长的在前），0xFE之后没有数据的为beta1.8~1.3
+LEGACY_PREFIXES = (
+    (b"\x01\xfa", LEGACY.V1_6),
+    (b"\x01", LEGACY.V1_4),
+)
+LEGACY_MAX_LENGTH = 1024  # 1.6-ping的最大长度（主机名最长255个字符）
+LEGACY_WAIT = 0.1  # 秒，等待0xFE之后的数据，beta客户端只发送0xFE
+LEGACY_DRAIN = 1.0  # 秒，发送响应后等待客户端关闭连接的最长时间
+CLIENT_TIMEOUT = 5  # 秒，单个连接的总处理时间上限，防止客户端缓慢逐字节发送长期占用工作线程
+
+class Listener:
+    """一个监听地址及其统计"""
+    def __init__(self, ip, port, dual_stack=False):
+        self.ip = ip
+        self.port = port
+        self.dual_stack = dual_stack
+        self.server_socket = None
+        self.accepted = 0  # 累计连接数
+        self.active = 0    # 当前连接数
+        self.shed = 0      # 因负载过高拒绝的连接数
+
+    @property
+    def name(self):
+        return f"[{self.ip}]:{self.port}" if ":" in self.ip else f"{self.ip}:{self.port}"
+
+
 class SlpServer:
     def __init__(self,config):
         self.config = config
-        self.motd16 = self.create_motd16(config)
-        self.motd = self.create_motd(config)
-        self.kick_message = self.create_kick_message(config)
+        # 按数据的第一个字节分派的特殊协议，其余的第一个字节为varint长度
+        self.first_byte_handlers = {
+            0xFE: self.handle_head,  # 1.6及以前的旧版ping
+        }
+        # 活动连接数
+        self.connections = 0
+        self.pending = 0  # 已接受但还在等待工作线程的连接数
+        self.connections_lock = threading.Lock()
+        self.memory_guard = MemoryGuard(config["memory"]["budget_mb"] * 1024 * 1024)
+        # 状态与踢出响应由渲染器预先生成完整的数据包，发送时只需一次sendall
+        self.renderer = StatusRenderer(config, lambda: self.connections)
+        self.listeners = []
+        self.capture = None
+        self.ready = threading.Event()#开始监听后设置
         self.is_loop = False
         logger.info("SLP服务器初始化完成")
     
-    @staticmethod
-    def create_motd16(config):
-        send_bytes = bytes((
-            "§1\0" +
-            str(config["protocol"]) + "\0" +
-            "Too old!\0" +
-            "The client is too old. Please use client 1.7+\0" +#因为1.6只支持英文，只能这么做
-            str(len(config["samples"])) + "\0" +
-            str(len(config["samples"])) + "\0"
-        ).encode('utf-16-be'))
-        send_head = bytearray()
-        send_head.append(0xff)  # 插入packet id
-        write_ushort(send_head, len(send_bytes) // 2)  # 字符长度
-        
-        return send_head + send_bytes
+    def setup_listen_socket(self, server_socket):
+        """按配置设置监听socket，缓冲区大小需要在listen前设置，accept出的连接会继承"""
+        options = self.config["socket"]
+        if options["rcvbuf"] > 0:
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, options["rcvbuf"])
+        if options["sndbuf"] > 0:
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, options["sndbuf"])
+        # 以下选项依赖平台，不支持时跳过
+        if options["tcp_defer_accept"] > 0:
+            if hasattr(socket, "TCP_DEFER_ACCEPT"):
+                server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT, options["tcp_defer_accept"])
+            else:
+                logger.warning("当前平台不支持TCP_DEFER_ACCEPT，已忽略")
+        if options["tcp_fastopen"] > 0:
+            if hasattr(socket, "TCP_FASTOPEN"):
+                server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_FASTOPEN, options["tcp_fastopen"])
+            else:
+                logger.warning("当前平台不支持TCP_FASTOPEN，已忽略")
 
-    @staticmethod
-    def create_motd(config):
-        logger.info("创建motd")
-        #创建motd
-        motd = {
-            "version": {"name": config["version_text"], "protocol": config["protocol"]},
-            "players": {"max": len(config["samples"]), "online": len(config["samples"]), "sample": [{"name": sample, "id": str(uuid.uuid4())} for sample in config["samples"]]},
-            "description": {"text": config["motd"]}
-        }
+    def setup_client_socket(self, client_socket):
+        if self.config["socket"]["tcp_nodelay"]:
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
 
-        if not os.path.exists(config["server_icon"]):
-            logger.warning("未找到服务器图标，默认为空")
-        #不添加motd["favicon"]即可（此为可选项）
-        else:
-            with open(config["server_icon"], 'rb') as image:
-                motd["favicon"] = "data:image/png;base64," + base64.b64encode(image.read()).decode()
+    def abort_client_socket(self, client_socket):
+        """以RST关闭连接，不进入TIME_WAIT，用于发送无效数据或超时的客户端"""
+        if self.config["socket"]["linger_rst"]:
+            try:
+                client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            except OSError:
+                pass
 
-        return json.dumps(motd)
-    
-    @staticmethod
-    def create_kick_message(config):
-        return json.dumps({"text": config["kick_message"]})
+    def setup_thread_stack_size(self):
+        """低占用模式下减小之后创建的线程（线程池工作线程）的栈大小"""
+        memory = self.config["memory"]
+        if not memory["low_footprint"]:
+            return
+        try:
+            threading.stack_size(memory["thread_stack_size"])
+            logger.info(f"已启用低占用模式，线程栈大小[{memory["thread_stack_size"]}]bytes")
+        except (ValueError, RuntimeError) as e:
+            logger.error(f"设置线程栈大小失败: {str(e)}")
 
     def start(self,wait=False,name=None,max_threads=10):
         if self.is_loop:
@@ -98,38 +143,135 @@ class SlpServer:
         self.is_loop = False
         logger.info("正在关闭SLP服务器")
 
-    def loop(self,max_threads=10):
-        logger.info("SLP服务器循环已启动")
-        #FS创建部分
+    def get_listen_entries(self):
+        """listen为空时使用ip与port作为唯一的监听地址"""
+        if self.config["listen"]:
+            return self.config["listen"]
+        return [{"ip": self.config["ip"], "port": self.config["port"]}]
+
+    def create_listen_socket(self, listener):
+        family = socket.AF_INET6 if ":" in listener.ip else socket.AF_INET
+        server_socket = socket.socket(family, socket.SOCK_STREAM)
         try:
-            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, True)
-            server_socket.bind((self.config["ip"], self.config["port"]))
-            server_socket.settimeout(None)  # 无限等待
-        except Exception as e:
-            logger.error(f"SLP服务器启动失败: {traceback.format_exc()}")
+            if family == socket.AF_INET6:
+                # 双栈：同一个IPv6 socket同时接受IPv4连接（地址为::ffff:a.b.c.d）
+                server_socket.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, not listener.dual_stack)
+            self.setup_listen_socket(server_socket)
+            server_socket.bind((listener.ip, listener.port))
+            server_socket.listen(self.config["socket"]["backlog"])  # 挂起连接队列长度，超出的连接由系统拒绝
+            server_socket.setblocking(False)  # 由selector通知可以accept
+        except:
             server_socket.close()
-            server_socket = None
+            raise
+        listener.port = server_socket.getsockname()[1]  # port为0时更新为实际端口
+        return server_socket
+
+    def accept_client(self, listener, executor):
+        try:
+            client_socket, client_address = listener.server_socket.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:#客户端在accept前已断开等情况
+            logger.warning(f"[{listener.name}]接受连接失败: {str(e)}")
+            return
+        client_socket.setblocking(True)  # 不继承监听socket的非阻塞模式
+        self.setup_client_socket(client_socket)
+        with self.connections_lock:
+            listener.accepted += 1
+        logger.info(f"[{listener.name}]收到来自{client_address[0]}:{client_address[1]}的连接")
+        reason = self.get_shed_reason()
+        if reason is not None:
+            #负载过高，直接以RST断开，不占用工作线程与队列
+            logger.warning(f"{reason}，拒绝连接")
+            with self.connections_lock:
+                listener.shed += 1
+            self.abort_client_socket(client_socket)
+            client_socket.close()
+            return
+        if self.capture is not None:
+            client_socket = self.capture.wrap(client_socket, client_address)
+        with self.connections_lock:
+            self.pending += 1
+        executor.submit(self.run_client, client_socket, listener)  # 提交到线程池
+
+    def get_shed_reason(self):
+        """返回需要拒绝新连接的原因，不需要时返回None"""
+        max_pending = self.config["memory"]["max_pending"]
+        if max_pending > 0 and self.pending >= max_pending:
+            return f"等待处理的连接数已达上限[{max_pending}]"
+        if self.memory_guard.over_budget():
+            return f"内存占用[{self.memory_guard.rss // (1024 * 1024)}MiB]超出预算[{self.config["memory"]["budget_mb"]}MiB]"
+        return None
+
+    def run_client(self, client_socket, listener):
+        with self.connections_lock:
+            self.pending -= 1
+        self.handle_socket(client_socket, listener)
 
-        # FS监听部分
-        if server_socket is not None:
+    def report_stats(self):
+        with self.connections_lock:
+            stats = [(listener.name, listener.accepted, listener.active, listener.shed) for listener in self.listeners]
+            connections = self.connections
+        for name, accepted, active, shed in stats:
+            logger.info(f"监听[{name}]：累计连接[{accepted}]，当前连接[{active}]，拒绝连接[{shed}]")
+        logger.info(f"全部监听：累计连接[{sum(stat[1] for stat in stats)}]，当前连接[{connections}]，"
+                    f"拒绝连接[{sum(stat[3] for stat in stats)}]")
+
+    def loop(self,max_threads=10):
+        logger.info("SLP服务器循环已启动")
+        #FS创建部分，某个地址监听失败时跳过该地址
+        self.listeners = []
+        for entry in self.get_listen_entries():
+            try:
+                listener = Listener(entry["ip"], entry["port"], entry.get("dual_stack", False))
+                listener.server_socket = self.create_listen_socket(listener)
+                self.listeners.append(listener)
+            except Exception as e:
+                logger.error(f"在[{entry}]监听失败: {str(e)}")
+
+        # FS监听部分，所有监听地址共用一个线程池与预生成的响应
+        if not self.listeners:
+            logger.error("没有可用的监听地址，SLP服务器启动失败")
+        else:
+            selector = selectors.DefaultSelector()
+            self.setup_thread_stack_size()
+            executor = ThreadPoolExecutor(max_workers=max_threads)
+            stats_interval = self.config["stats_interval"]
             try:
-                executor = ThreadPoolExecutor(max_workers=max_threads)
-                server_socket.listen(max_threads)  # 允许max_threads个挂起的链接（与线程数相同）
-                logger.info(f"SLP服务器启动成功，在[{self.config["ip"]}:{self.config["port"]}]监听")
+                if self.config["capture"]["enabled"]:
+                    self.capture = TrafficCapture(self.config["capture"]["file"])
+                    logger.info(f"已启用抓包，写入到[{self.config["capture"]["file"]}]")
+                for listener in self.listeners:
+                    selector.register(listener.server_socket, selectors.EVENT_READ, listener)
+                self.renderer.start()
+                logger.info(f"SLP服务器启动成功，在{"、".join(f"[{listener.name}]" for listener in self.listeners)}监听")
+                self.ready.set()
+                next_report = time.monotonic() + stats_interval
                 while self.is_loop:
-                    client_socket, client_address = server_socket.accept()
-                    logger.info(f"收到来自{client_address[0]}:{client_address[1]}的连接")
-                    executor.submit(self.handle_socket, client_socket)  # 提交到线程池
+                    #超时用于检查is_loop与输出统计
+                    for key, _ in selector.select(timeout=1):
+                        self.accept_client(key.data, executor)
+                    if stats_interval > 0 and time.monotonic() >= next_report:
+                        self.report_stats()
+                        next_report = time.monotonic() + stats_interval
             except Exception as e:
                 logger.error(f"发生其它错误: {traceback.format_exc()}")
             except KeyboardInterrupt:
-                logger.warn("收到键盘中断，正在停止SLP服务器")
+                logger.warning("收到键盘中断，正在停止SLP服务器")
                 executor.shutdown(wait=True)
             finally:
-                server_socket.close()
-                server_socket = None
+                selector.close()
+                for listener in self.listeners:
+                    listener.server_socket.close()
+                    listener.server_socket = None
+                self.report_stats()
+                self.renderer.stop()
+                if self.capture is not None:
+                    self.capture.close()
+                    self.capture = None
                 self.is_loop = False#强制设置为False
+                self.ready.clear()
 
         logger.info("SLP服务器已退出")
 
@@ -140,17 +282,24 @@ class SlpServer:
         然后在任何其他请求之前，发送binding包绑定	
         服务器再进行回复
     '''
-    def handle_socket(self,client_socket):
+    def handle_socket(self,client_socket,listener=None):
+        abort = False#是否以RST关闭连接
+        deadline = time.monotonic() + CLIENT_TIMEOUT#整个连接共用一个截止时间，而不是每次读取重新计时
+        with self.connections_lock:
+            self.connections += 1
+            if listener is not None:
+                listener.active += 1
         try:
             status = REQUEST.HANDSHAKING
             while True:
                 try:
-                    head = read_exactly(client_socket,1,timeout=5)[0]
+                    head = read_exactly(client_socket,1,timeout=self.time_left(deadline))[0]
                     logger.info(f"收到数据：[1]>[{hex(head)}]")
     
                     #处理特殊数据头
-                    if head == 0xFE:  # 1.6兼容协议，FE开头，强制匹配识别
-                        self.handle_head(head,client_socket,status)
+                    handler = self.first_byte_handlers.get(head)
+                    if handler is not None:
+                        handler(head,client_socket,status,deadline)
                         return#处理完成离开
                     #否则继续
     
@@ -161,7 +310,7 @@ class SlpServer:
                         for j in range(1,6):
                             if j >= 5:
                                 raise BytesReaderError("Insufficient data for varint")
-                            byte_in = read_exactly(client_socket, 1, timeout=5)[0]
+                            byte_in = read_exactly(client_socket, 1, timeout=self.time_left(deadline))[0]
                             length |= (byte_in & 0x7F) << (j * 7)
                             if (byte_in & 0x80) != 0x80:
                                 break
@@ -172,7 +321,7 @@ class SlpServer:
                         raise BytesReaderError("Data length is too large")
                     
                     #正常数据，数据头解释为长度，继续接收
-                    data = BytesReader(read_exactly(client_socket, length, timeout=5))
+                    data = BytesReader(read_exactly(client_socket, length, timeout=self.time_left(deadline)))
                     logger.info(f"收到数据：[{data.len()}]>[{format_hex(data.getdata())}]")
     
                     #通过包id处理数据
@@ -193,13 +342,13 @@ class SlpServer:
                                 status = REQUEST.UNKNOWN #切换状态到unknown，防止被利用，导致无限循环发包
                                 continue#客户端在binding后有可能还会进行一次ping和pong测试延迟，需要重试等待客户端，而不是立刻断开连接
                             else:
-                                logger.warn("binding长度错误")
+                                logger.warning("binding长度错误")
                             return
                         elif status == REQUEST.UNKNOWN:#未知请求则跳出断开连接
-                            logger.warn("识别为unknown")
+                            logger.warning("识别为unknown")
                             return
                         else:
-                            logger.warn("数据错误，出现意外的的status值")
+                            logger.warning("数据错误，出现意外的的status值")
                             return
                     elif packet_id == 0x01:
                         logger.info("识别为ping")
@@ -210,29 +359,45 @@ class SlpServer:
                         return
                 except BytesReaderError as e:
                     logger.warning(f"收到了无效数据[{e}]")
+                    abort = True
                     return
                 except TypeError as e:
                     logger.warning(f"收到了无效数据[{e}]")
+                    abort = True
                     return
                 except IndexError as e:
                     logger.warning(f"收到了无效数据[{e}]")
+                    abort = True
                     return
                 except ConnectionError:
                     logger.warning("客户端提前断开连接")
                     return
                 except socket.timeout:
                     logger.warning("客户端连接超时")#此处超时处理read_exactly
+                    abort = True
                     return
                 except Exception as e:
                     logger.error(f"发生其它错误: {traceback.format_exc()}")
                     return
         finally:
             #关闭退出
+            if abort:
+                self.abort_client_socket(client_socket)
             client_socket.close()
             client_socket = None
+            with self.connections_lock:
+                self.connections -= 1
+                if listener is not None:
+                    listener.active -= 1
             logger.info("断开链接")
-        
 
+    @staticmethod
+    def time_left(deadline):
+        """返回距离连接截止时间的剩余秒数，已超时时抛出socket.timeout"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout(f'Timeout after {CLIENT_TIMEOUT} seconds')
+        return remaining
 
     # https://minecraft.wiki/w/Java_Edition_protocol#Handshaking
     # https://minecraft.wiki/w/Minecraft_Wiki:Projects/wiki.vg_merge/Server_List_Ping#Current_(1.7+)
@@ -263,62 +428,102 @@ class SlpServer:
             return REQUEST.UNKNOWN
 
     # https://minecraft.wiki/w/Minecraft_Wiki:Projects/wiki.vg_merge/Server_List_Ping#1.6
-    def handle_head(self,head,client_socket,status):
-        next2 = read_exactly(client_socket, 2, timeout=5)
-        logger.info(f"收到数据：[2]>[{format_hex(next2)}]")
-        if next2[0] != 0x01 or next2[1] != 0xFA:# 确认后两个是 01和fa
+    # https://minecraft.wiki/w/Minecraft_Wiki:Projects/wiki.vg_merge/Server_List_Ping#1.4_to_1.5
+    # https://minecraft.wiki/w/Minecraft_Wiki:Projects/wiki.vg_merge/Server_List_Ping#Beta_1.8_to_1.3
+    def handle_head(self,head,client_socket,status,deadline):
+        #旧版客户端会一次发送完整的ping，只读取已经到达的数据，不等待旧版客户端不会发送的数据
+        data = read_available(client_socket, LEGACY_MAX_LENGTH, min(LEGACY_WAIT, self.time_left(deadline)))
+        logger.info(f"收到数据：[{len(data)}]>[{format_hex(data)}]")
+        snapshot = self.renderer.get_snapshot()
+        if not data:
+            logger.info("识别为beta1.8~1.3-ping")
+            client_socket.sendall(snapshot.beta_packet)
+            self.drain_legacy(client_socket, 0, deadline)
+            return
+        
+        if self.match_legacy_prefix(data) is None:
             logger.warning("收到了意外的数据包")
             return
-        else:
+        
+        # 以踢出数据包响应客户端，告知用户客户端太旧，使用新版本（1.4~1.6的响应相同）
+        logger.info("发送旧版ping响应")
+        client_socket.sendall(snapshot.legacy_packet)
+        #1.6-ping较长，可能分为多个数据段到达，响应后读取剩余的数据再识别与解析
+        rest = self.drain_legacy(client_socket, len(data), deadline)
+        if rest:
+            logger.info(f"收到数据：[{len(rest)}]>[{format_hex(rest)}]")
+            data += rest
+        if self.match_legacy_prefix(data) == LEGACY.V1_6:
             logger.info("识别为1.6-ping")
-            length = read_exactly(client_socket, 2, timeout=5)
-            logger.info(f"收到数据：[2]>[{format_hex(length)}]")
-            length = BytesReader(length).read_ushort()
+            self.parse_ping_host(data[2:])
+        else:
+            logger.info("识别为1.4~1.5-ping")
+    
+    @staticmethod
+    def match_legacy_prefix(data):
+        """返回0xFE之后的数据对应的旧版ping类型，无法识别时返回None"""
+        for prefix, version in LEGACY_PREFIXES:
+            if data.startswith(prefix):
+                return version
+        return None
+    
+    @staticmethod
+    def drain_legacy(client_socket, received, deadline):
+        """
+            发送响应后关闭写方向，读取客户端剩余的数据直到客户端关闭连接，
+            避免接收缓冲区中还有未读数据（或之后才到达）时close发出RST，导致客户端丢弃还未读取的响应
+        """
+        try:
+            client_socket.shutdown(socket.SHUT_WR)
+        except OSError:
+            return b""
+        return read_until_close(client_socket, LEGACY_MAX_LENGTH - received, min(LEGACY_DRAIN, deadline - time.monotonic()))
+    
+    @staticmethod
+    def parse_ping_host(data):
+        """解析1.6-ping的MC|PingHost插件消息，仅用于记录日志，数据不完整时不影响响应"""
+        try:
+            data = BytesReader(data)
+            #数据不完整（客户端未发送完就断开或超时）时不解析，不视为无效数据
+            if data.len() < 4:
+                raise EOFError
+            length = data.read_ushort()
             if length != 11:#0x00 0x0B
-                logger.warning("收到了意外的数据包")
-                return
-            #转换为长度读取下一个字符串
-            logger.info(f"下个数据长度：[{length * 2}]")
-            mc_ping_host = read_exactly(client_socket, length*2 ,timeout=5)
-            logger.info(f"收到数据：[{length*2}]>[{format_hex(mc_ping_host)}]")
+                raise BytesReaderError("Unexpected channel length")
+            if data.len() < 2 + length * 2 + 2:
+                raise EOFError
             #转换编码到utf8并验证
-            mc_ping_host = mc_ping_host.decode('utf-16-be').encode('utf-8').decode()
+            mc_ping_host = data.read_bytes(length * 2).decode('utf-16-be')
             if mc_ping_host != "MC|PingHost":
-                logger.warning("收到了意外的数据包")
-                return
-            #接收下一个短整型
-            logger.info(f"下个数据长度：[2]")
-            length = read_exactly(client_socket, 2, timeout=5)
-            logger.info(f"收到数据：[2]>[{format_hex(length)}]")
-            length = BytesReader(length).read_ushort()
-            #接收剩余数据
-            logger.info(f"剩余数据长度：[{length}]")
-            data = read_exactly(client_socket, length, timeout=5)
-            logger.info(f"收到数据：[{length}]>[{format_hex(data)}]")
-            data = BytesReader(data)
+                raise BytesReaderError("Unexpected channel")
+            #剩余数据长度
+            length = data.read_ushort()
+            if data.len() - data.i < length:
+                raise EOFError
             #解析
             protocol_version = data.read_byte()#1
             u16str_length = data.read_ushort()#2
             u16str_size = length - 7#前面一共3，后面端口号4，合起来是7
             if u16str_length*2 != u16str_size:
-                logger.warning("收到了意外的数据包")
-                return
+                raise BytesReaderError("Unexpected hostname length")
             #读取主机名
-            server_ip = data.read_bytes(u16str_size).decode('utf-16-be').encode('utf-8').decode()
+            server_ip = data.read_bytes(u16str_size).decode('utf-16-be')
             #读取端口号
             port = data.read_int()#4
-            
-            logger.info(f"数据解析：mc_ping_host[{mc_ping_host}], protocol_version[{protocol_version}], server_ip[{server_ip}], port[{port}]")
-            
-            logger.info("发送1.6-ping响应")
-            # 以踢出数据包响应客户端，告知用户客户端太旧，使用新版本
-            client_socket.sendall(self.motd16)
+        except EOFError:
+            logger.info("1.6-ping数据不完整，跳过解析")
+            return
+        except (BytesReaderError, UnicodeDecodeError) as e:
+            logger.warning(f"1.6-ping数据无效[{e}]")
+            return
+        
+        logger.info(f"数据解析：mc_ping_host[{mc_ping_host}], protocol_version[{protocol_version}], server_ip[{server_ip}], port[{port}]")
 
     #https://minecraft.wiki/w/Java_Edition_protocol#Clientbound
     #https://minecraft.wiki/w/Java_Edition_protocol#Clientbound_2
     def handle_binding(self,client_socket,status):
         logger.info("发送motd")
-        write_str_response(client_socket, 0x00, self.motd)  # 发送motd
+        client_socket.sendall(self.renderer.current_status())  # 发送当前槽位的motd
     
     # https://minecraft.wiki/w/Java_Edition_protocol#Login_Start
     #https://minecraft.wiki/w/Java_Edition_protocol#Disconnect_(login)
@@ -346,17 +551,15 @@ class SlpServer:
                 
         logger.info(f"数据解析：player_name[{player_name}], profile_id[{profile_id}], uuid:[{uuid}]")
         logger.info("发送kick_message")#实际上是disconnect，但是为了更直观和保持配置文件不变，索性就叫踢出消息
-        write_str_response(client_socket, 0x00, self.kick_message)
+        client_socket.sendall(self.renderer.get_snapshot().kick_packet)
     
     # https://minecraft.wiki/w/Java_Edition_protocol#Pong_Response_(status)
     @staticmethod
     def handle_ping(client_socket,data):
         long_data = data.read_long()
         logger.info(f"数据解析：long_data[{long_data}]")
-        response = bytearray()
-        write_varint(response, 9)#长度9
-        write_varint(response, 0x01)#packet_id
-        write_long(response, long_data)#pong数据（从ping中读取）
+        #长度9 + packet_id 0x01 + pong数据（从ping中读取），一次打包
+        response = struct.pack(">BBq", 9, 0x01, long_data)
         logger.info("发送pong响应")
         client_socket.sendall(response)#发送pong包
 
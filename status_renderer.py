@@ -0,0 +1,201 @@
+import json
+import time
+import uuid
+import base64
+import random
+import os.path
+import datetime
+import functools
+import threading
+
+from collections import namedtuple
+from byte_utils import *
+from server_logger import ServerLogger
+from maintenance_schedule import Schedule
+
+logger = ServerLogger()
+
+# 样本uuid的命名空间，同一位置的同一条样本在每次启动时uuid不变
+SAMPLE_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://github.com/chenjunfu2/MC_SLP")
+
+# 渲染结果，整体替换发布，读取方无需加锁
+PacketSnapshot = namedtuple('PacketSnapshot', ['status_ring', 'rotate_interval', 'kick_packet', 'legacy_packet', 'beta_packet'])
+
+# 旧版客户端只能显示英文，只能这么做
+LEGACY_VERSION_TEXT = "Too old!"
+LEGACY_MOTD = "The client is too old. Please use client 1.7+"
+
+
+class ONLINE_MODE:
+    SAMPLES = "samples"          # 在线人数为样本总数（与旧版行为一致）
+    FIXED = "fixed"              # 固定为players.online
+    RANDOM = "random"            # 每页在players.online~players.online_max之间随机
+    CONNECTIONS = "connections"  # 当前SLP服务器的活动连接数
+    ALL = (SAMPLES, FIXED, RANDOM, CONNECTIONS)
+
+
+@functools.lru_cache(maxsize=4)
+def encode_favicon(filename, mtime_ns, size):
+    """按文件修改时间与大小缓存编码结果，重新渲染时不必重复读取与编码"""
+    with open(filename, 'rb') as image:
+        return "data:image/png;base64," + base64.b64encode(image.read()).decode()
+
+
+class StatusRenderer:
+    """
+        后台渲染状态响应包：将样本池按页拆分，为每一页预先生成完整的状态数据包组成环，
+        请求时只按当前时间选取环中的一个槽位，不在请求时生成json
+        启用维护时间表时，每秒最多重新渲染一次（倒计时），渲染结果整体发布到snapshot
+        第一次渲染在start()的后台线程中进行，不阻塞启动与绑定端口，在此之前收到的请求会同步渲染
+    """
+    def __init__(self, config, online_source=None):
+        self.config = config
+        self.players = config["players"]
+        self.online_source = online_source  # connections模式下获取在线人数的函数
+        self.online_mode = self.players["online_mode"]
+        if self.online_mode not in ONLINE_MODE.ALL:
+            logger.error(f"配置项 'players.online_mode' 值错误 - 需要: {"/".join(ONLINE_MODE.ALL)}, "
+                         f"实际: {self.online_mode}，已使用{ONLINE_MODE.SAMPLES}")
+            self.online_mode = ONLINE_MODE.SAMPLES
+        self.pages = self.create_pages(config["samples"], self.players["page_size"])
+        self.schedule = Schedule(config["schedule"])
+        self.snapshot = None
+        self._texts = None
+        self._favicon_warned = False
+        self._render_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def load_favicon(self):
+        #文件不存在或无法读取（目录、没有权限、在stat之后被删除）时都视为没有图标，否则每次渲染都会失败
+        try:
+            stat = os.stat(self.config["server_icon"])
+            return encode_favicon(self.config["server_icon"], stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
+            if not self._favicon_warned:
+                logger.warning(f"未找到服务器图标或无法读取，默认为空[{e}]")
+                self._favicon_warned = True
+            return None
+
+    @staticmethod
+    def create_pages(samples, page_size):
+        #为每条样本生成固定的uuid，再按页大小拆分
+        entries = [{"name": sample, "id": str(uuid.uuid5(SAMPLE_NAMESPACE, f"{index}:{sample}"))}
+                   for index, sample in enumerate(samples)]
+        if page_size <= 0 or page_size >= len(entries):
+            return [entries]
+        return [entries[i:i + page_size] for i in range(0, len(entries), page_size)]
+
+    def is_dynamic(self):
+        """在线人数是否会随时间变化，需要后台定时重新渲染"""
+        return self.online_mode in (ONLINE_MODE.RANDOM, ONLINE_MODE.CONNECTIONS)
+
+    def is_scheduled(self):
+        return self.schedule.enabled and len(self.schedule.windows) > 0
+
+    def get_online(self):
+        mode = self.online_mode
+        if mode == ONLINE_MODE.FIXED:
+            return self.players["online"]
+        elif mode == ONLINE_MODE.RANDOM:
+            return random.randint(self.players["online"], max(self.players["online"], self.players["online_max"]))
+        elif mode == ONLINE_MODE.CONNECTIONS and self.online_source is not None:
+            return self.online_source()
+        return len(self.config["samples"])
+
+    def get_max(self, online):
+        return self.players["max"] if self.players["max"] >= 0 else online
+
+    def create_motd(self, texts, page, online):
+        #创建motd
+        motd = {
+            "version": {"name": texts["version_text"], "protocol": self.config["protocol"]},
+            "players": {"max": self.get_max(online), "online": online, "sample": page},
+            "description": {"text": texts["motd"]}
+        }
+        #没有图标时不添加motd["favicon"]即可（此为可选项）
+        favicon = self.load_favicon()
+        if favicon is not None:
+            motd["favicon"] = favicon
+        return json.dumps(motd)
+
+    @staticmethod
+    def create_kick_message(texts):
+        return json.dumps({"text": texts["kick_message"]})
+
+    # https://minecraft.wiki/w/Minecraft_Wiki:Projects/wiki.vg_merge/Server_List_Ping#1.4_to_1.5
+    def create_legacy_packet(self, online):
+        """1.4~1.6的ping响应：§1开头，各字段以\0分隔"""
+        return create_legacy_kick_packet("\0".join((
+            "§1",
+            str(self.config["protocol"]),
+            LEGACY_VERSION_TEXT,
+            LEGACY_MOTD,
+            str(online),
+            str(self.get_max(online))
+        )))
+
+    # https://minecraft.wiki/w/Minecraft_Wiki:Projects/wiki.vg_merge/Server_List_Ping#Beta_1.8_to_1.3
+    def create_beta_packet(self, online):
+        """beta1.8~1.3的ping响应：motd§在线人数§最大人数，motd中不能含有§"""
+        return create_legacy_kick_packet("§".join((LEGACY_MOTD, str(online), str(self.get_max(online)))))
+
+    def render(self, now=None):
+        with self._render_lock:
+            texts = self.schedule.apply(self.config, datetime.datetime.now() if now is None else now)
+            #文本与在线人数都没有变化时不需要重新生成
+            if texts == self._texts and not self.is_dynamic():
+                return
+            status_ring = tuple(create_str_packet(0x00, self.create_motd(texts, page, self.get_online())) for page in self.pages)
+            kick_packet = create_str_packet(0x00, self.create_kick_message(texts))
+            online = self.get_online()
+            #整体替换，处理请求的线程要么读到旧的结果，要么读到新的结果
+            self.snapshot = PacketSnapshot(status_ring, max(self.players["rotate_interval"], 1), kick_packet,
+                                           self.create_legacy_packet(online), self.create_beta_packet(online))
+            self._texts = texts
+
+    def get_snapshot(self):
+        snapshot = self.snapshot
+        if snapshot is None:#后台线程还未完成第一次渲染
+            self.render()
+            snapshot = self.snapshot
+        return snapshot
+
+    def current_status(self):
+        snapshot = self.get_snapshot()
+        ring = snapshot.status_ring
+        return ring[int(time.monotonic() // snapshot.rotate_interval) % len(ring)]
+
+    def _wait_next_tick(self):
+        if self.is_scheduled():
+            #对齐到下一个整秒，倒计时每秒只渲染一次
+            return self._stop_event.wait(1 - time.time() % 1)
+        return self._stop_event.wait(max(self.players["rotate_interval"], 1))
+
+    def _run(self):
+        try:
+            self.render()
+        except Exception as e:
+            logger.error(f"渲染状态响应失败: {str(e)}")
+        #静态内容只需渲染一次
+        if not (self.is_dynamic() or self.is_scheduled()):
+            return
+        while not self._wait_next_tick():
+            try:
+                self.render()
+            except Exception as e:
+                logger.error(f"渲染状态响应失败: {str(e)}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="StatusRenderer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
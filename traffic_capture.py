@@ -0,0 +1,210 @@
+import os
+import time
+import itertools
+import threading
+
+from collections import namedtuple
+from byte_utils import *
+
+'''
+    抓包文件格式（仅追加写入）：
+    文件头：MAGIC + 版本号(1byte)
+    之后为连续的记录，每条记录：record_type(1byte) + conn_id(varint) + 时间(varlong，微秒)
+        SESSION：时间为会话开始的unix时间，conn_id固定为0，每次启动抓包写入一条
+        OPEN：时间为相对会话开始的偏移，后跟对端地址(utf)
+        IN/OUT：时间为相对连接建立的偏移，后跟数据长度(varint) + 原始数据
+        CLOSE：时间为相对连接建立的偏移
+'''
+CAPTURE_MAGIC = b"MCSLPCAP"
+CAPTURE_VERSION = 1
+
+
+class RECORD:
+    SESSION = 0x00
+    OPEN = 0x01
+    IN = 0x02   # 客户端 -> 服务器
+    OUT = 0x03  # 服务器 -> 客户端
+    CLOSE = 0x04
+
+
+CapturedEvent = namedtuple('CapturedEvent', ['time', 'direction', 'data'])
+
+
+class CapturedConnection:
+    def __init__(self, conn_id, start, peer):
+        self.conn_id = conn_id
+        self.start = start  # 相对会话开始的秒数
+        self.peer = peer
+        self.events = []    # CapturedEvent列表，time为相对连接建立的秒数
+        self.closed = False
+
+    def inbound(self):
+        return [event for event in self.events if event.direction == RECORD.IN]
+
+    def outbound_bytes(self):
+        return b"".join(event.data for event in self.events if event.direction == RECORD.OUT)
+
+
+class TrafficCapture:
+    def __init__(self, filename):
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._start = time.perf_counter()
+        self.filename = filename
+        # 进程被强制结束时文件末尾可能是不完整的记录，追加前截断到最后一条完整记录，否则新会话会与之错位
+        valid_length = 0
+        if os.path.exists(filename):
+            with open(filename, "rb") as file:
+                valid_length = find_valid_length(file.read())
+        self.file = open(filename, "ab")
+        if self.file.tell() > valid_length:
+            self.file.truncate(valid_length)
+
+        # 新文件写入文件头，已有文件直接在末尾追加新的会话
+        if valid_length == 0:
+            self.file.write(CAPTURE_MAGIC + bytes((CAPTURE_VERSION,)))
+        self._write(RECORD.SESSION, 0, int(time.time() * 1_000_000))
+        self.file.flush()
+
+    def _write(self, record_type, conn_id, timestamp, payload=None):
+        record = bytearray()
+        write_byte(record, record_type)
+        write_varint(record, conn_id)
+        write_varint(record, timestamp)
+        if payload is not None:
+            write_varint(record, len(payload))
+            record += payload
+        with self._lock:
+            if not self.file.closed:
+                self.file.write(record)
+
+    def wrap(self, client_socket, client_address):
+        conn_id = next(self._ids)
+        opened = time.perf_counter()
+        peer = bytearray()
+        write_utf(peer, f"{client_address[0]}:{client_address[1]}")
+        self._write(RECORD.OPEN, conn_id, int((opened - self._start) * 1_000_000), bytes(peer))
+        return CaptureSocket(client_socket, self, conn_id, opened)
+
+    def record(self, record_type, conn_id, opened, payload=None):
+        self._write(record_type, conn_id, int((time.perf_counter() - opened) * 1_000_000), payload)
+        if record_type == RECORD.CLOSE:
+            with self._lock:
+                if not self.file.closed:
+                    self.file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+class CaptureSocket:
+    """包装客户端socket，记录收发的原始字节，其余操作直接转发给原socket"""
+    def __init__(self, sock, capture, conn_id, opened):
+        self._sock = sock
+        self._capture = capture
+        self._conn_id = conn_id
+        self._opened = opened
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    def recv(self, bufsize, *args):
+        data = self._sock.recv(bufsize, *args)
+        if data:
+            self._capture.record(RECORD.IN, self._conn_id, self._opened, data)
+        return data
+
+    def recv_into(self, buffer, nbytes=0, *args):
+        count = self._sock.recv_into(buffer, nbytes, *args)
+        if count:
+            self._capture.record(RECORD.IN, self._conn_id, self._opened, bytes(buffer[:count]))
+        return count
+
+    def sendall(self, data, *args):
+        self._capture.record(RECORD.OUT, self._conn_id, self._opened, bytes(data))
+        return self._sock.sendall(data, *args)
+
+    def close(self):
+        if self._sock.fileno() != -1:
+            self._capture.record(RECORD.CLOSE, self._conn_id, self._opened)
+        self._sock.close()
+
+
+def read_header(data):
+    """检查文件头，返回第一条记录的位置"""
+    if data[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+        raise BytesReaderError("Not a capture file")
+    reader = BytesReader(data, len(CAPTURE_MAGIC))
+    version = reader.read_byte()
+    if version != CAPTURE_VERSION:
+        raise BytesReaderError(f"Unsupported capture version [{version}]")
+    return reader.i
+
+
+def read_record(reader):
+    """读取一条记录，返回(record_type, conn_id, 时间(秒), payload)，OPEN记录的payload为对端地址，记录不完整时抛出异常"""
+    record_type = reader.read_byte()
+    conn_id = reader.read_varint()
+    timestamp = reader.read_varlong() / 1_000_000
+    payload = None
+    if record_type != RECORD.SESSION and record_type != RECORD.CLOSE:
+        payload = bytes(reader.read_bytes(reader.read_varint()))
+        if record_type == RECORD.OPEN:
+            payload = BytesReader(payload).read_str()
+    return record_type, conn_id, timestamp, payload
+
+
+def find_valid_length(data):
+    """返回最后一条完整记录的结束位置，文件头不完整时返回0，不是抓包文件时抛出异常"""
+    header_length = len(CAPTURE_MAGIC) + 1
+    if len(data) < header_length and (CAPTURE_MAGIC + bytes((CAPTURE_VERSION,))).startswith(data):
+        return 0
+    reader = BytesReader(data, read_header(data))
+    valid_length = reader.i
+    while reader.i < reader.len():
+        try:
+            read_record(reader)
+        except (BytesReaderError, IndexError):
+            break
+        valid_length = reader.i
+    return valid_length
+
+
+def read_capture(filename):
+    """读取抓包文件，返回会话列表，每个会话为按建立时间排序的CapturedConnection列表"""
+    with open(filename, "rb") as file:
+        data = file.read()
+
+    reader = BytesReader(data, read_header(data))
+    sessions = []
+    connections = None
+    while reader.i < reader.len():
+        # 文件末尾可能因进程被强制结束而不完整，丢弃不完整的记录
+        try:
+            record_type, conn_id, timestamp, payload = read_record(reader)
+        except (BytesReaderError, IndexError):
+            break
+
+        if record_type == RECORD.SESSION:
+            connections = {}
+            sessions.append(connections)
+            continue
+        if connections is None:
+            raise BytesReaderError("Record before session")
+
+        if record_type == RECORD.OPEN:
+            connections[conn_id] = CapturedConnection(conn_id, timestamp, payload)
+        elif conn_id in connections:
+            connection = connections[conn_id]
+            if record_type == RECORD.CLOSE:
+                connection.closed = True
+            else:
+                connection.events.append(CapturedEvent(timestamp, record_type, payload))
+
+    return [sorted(session.values(), key=lambda conn: conn.start) for session in sessions]